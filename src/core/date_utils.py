@@ -1,40 +1,55 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 import re
 
+_DAYS_RE = re.compile(r'(\d+)\s+days?\s*time')
+_ISO_RE = re.compile(r'\d{4}-\d{1,2}-\d{1,2}')
+
+_PHRASE_OFFSETS = {
+    '': 0,
+    'today': 0,
+    'tomorrow': 1,
+    'next tomorrow': 2,
+    'the day after tomorrow': 2,
+}
+
+_WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+_WEEKDAY_IDX = {day: idx for idx, day in enumerate(_WEEKDAYS)}
+
 def get_current_date() -> str:
     return datetime.utcnow().date().isoformat()
 
 def normalize_date(date_str: str = '') -> str:
     """Converts natural date phrases (e.g. 'tomorrow', 'two days time') into 'YYYY-MM-DD'."""
-    today = datetime.utcnow().date()
-    
-    if not date_str or date_str.lower() == 'today':
-        return today.isoformat()
+    return _normalize_date(date_str or '', datetime.utcnow().date())
 
+@lru_cache(maxsize=128)
+def _normalize_date(date_str: str, today: date) -> str:
     text = date_str.strip().lower()
 
-    if text in ['tomorrow']:
-        return (today + timedelta(days=1)).isoformat()
-    if text in ['next tomorrow', 'the day after tomorrow']:
-        return (today + timedelta(days=2)).isoformat()
+    offset = _PHRASE_OFFSETS.get(text)
+    if offset is not None:
+        return (today + timedelta(days=offset)).isoformat()
+
+    target_idx = _WEEKDAY_IDX.get(text)
+    if target_idx is not None:
+        today_idx = today.weekday()
+        delta = (target_idx - today_idx) % 7
+        if delta > 5:
+            raise ValueError("Forecast is limited to 5 days ahead.")
+        return (today + timedelta(days=delta)).isoformat()
 
-    match = re.match(r'(\d+)\s+days?\s*time', text)
+    match = _DAYS_RE.match(text)
     if match:
         days = int(match.group(1))
         if days > 5:
             raise ValueError("Forecast is limited to 5 days ahead.")
         return (today + timedelta(days=days)).isoformat()
 
-    weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-    if text in weekdays:
-        today_idx = today.weekday()
-        target_idx = weekdays.index(text)
-        delta = (target_idx - today_idx) % 7
-        if delta > 5:
-            raise ValueError("Forecast is limited to 5 days ahead.")
-        return (today + timedelta(days=delta)).isoformat()
+    if _ISO_RE.fullmatch(text):
+        try:
+            return datetime.strptime(text, '%Y-%m-%d').date().isoformat()
+        except ValueError:
+            pass
 
-    try:
-        return datetime.strptime(text, '%Y-%m-%d').date().isoformat()
-    except ValueError:
-        raise ValueError(f"Unsupported date format: {date_str}")
+    raise ValueError(f"Unsupported date format: {date_str}")
@@ -0,0 +1,41 @@
+from contextlib import closing
+import os
+import sqlite3
+
+CACHE_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "weather-agent")
+CACHE_PATH = os.path.join(CACHE_DIR, "forecasts.sqlite3")
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS forecasts ("
+        "location TEXT NOT NULL, hour TEXT NOT NULL, payload BLOB NOT NULL, "
+        "PRIMARY KEY (location, hour))"
+    )
+    return conn
+
+def load_forecast(location: str, hour: str) -> bytes | None:
+    """Returns the raw forecast payload stored for a location during the given UTC hour (YYYYMMDDHH)."""
+    try:
+        with closing(_connect()) as conn:
+            row = conn.execute(
+                "SELECT payload FROM forecasts WHERE location = ? AND hour = ?",
+                (location, hour)
+            ).fetchone()
+    except (OSError, sqlite3.Error):
+        return None
+
+    return row[0] if row else None
+
+def store_forecast(location: str, hour: str, payload: bytes) -> None:
+    """Stores a raw forecast payload and drops entries from earlier hours."""
+    try:
+        with closing(_connect()) as conn, conn:
+            conn.execute("DELETE FROM forecasts WHERE hour < ?", (hour,))
+            conn.execute(
+                "INSERT OR REPLACE INTO forecasts (location, hour, payload) VALUES (?, ?, ?)",
+                (location, hour, payload)
+            )
+    except (OSError, sqlite3.Error):
+        pass
@@ -1,8 +1,14 @@
-from datetime import date
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
-import json
-from . import date_utils
+import orjson
+import threading
+import time
+from . import date_utils, disk_cache
 from typing import TypedDict
 
 class WeatherRequest(TypedDict):
@@ -17,49 +23,108 @@ class ForeCastResponse(TypedDict):
     humidity: str
     precipitationProbability: str
 
-def parse_json(json_string: str) -> dict:
-    return json.loads(json_string)
+class ForecastValues(TypedDict):
+    time: str
+    temperature: float | None
+    weatherCode: int
+    windSpeed: float | None
+    humidity: float | None
+    precipitationProbability: float | None
+
+CACHE_MAXSIZE = 256
+REALTIME_CACHE_TTL = 300
+FORECAST_CACHE_TTL = 900
+
+# Upper bound on concurrent Tomorrow.io requests; also the per-host
+# connection pool size so every worker gets a kept-alive connection.
+MAX_CONNECTIONS = 8
+
+# Seconds to wait for Tomorrow.io to connect and to respond.
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Tool results keyed by location, stored as (expires_at, value).
+_realtime_cache: dict[str, tuple[float, dict]] = {}
+_forecast_cache: dict[str, tuple[float, list[dict]]] = {}
+# compare_weather reads and writes the caches from worker threads.
+_cache_lock = threading.Lock()
+
+# Shared across tool calls so requests to api.tomorrow.io reuse pooled
+# keep-alive connections instead of paying a TLS handshake each time.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=MAX_CONNECTIONS,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False,
+        respect_retry_after_header=False
+    )
+))
+
+def parse_json(data: bytes | str) -> dict:
+    return orjson.loads(data)
+
+def _cache_get(cache: dict, key: str):
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del cache[key]
+            return None
+
+        return value
+
+def _cache_set(cache: dict, key: str, value, ttl: float) -> None:
+    with _cache_lock:
+        if key not in cache and len(cache) >= CACHE_MAXSIZE:
+            del cache[next(iter(cache))]
+
+        cache[key] = (time.monotonic() + ttl, value)
+
+# Lower bounds (inclusive) of each label after the first.
+_TEMP_EDGES = (0, 10, 20, 30)
+_TEMP_LABELS = ("Freezing", "Cold", "Cool", "Warm", "Hot")
+
+_CONDITIONS: dict[int, str] = {
+    0: "Unknown",
+    1000: "Clear, Sunny",
+    1100: "Mostly Clear",
+    1101: "Partly Cloudy",
+    1102: "Mostly Cloudy",
+    1001: "Cloudy",
+    2000: "Fog",
+    2100: "Light Fog",
+    4000: "Drizzle",
+    4001: "Rain",
+    4200: "Light Rain",
+    4201: "Heavy Rain",
+    5000: "Snow",
+    5001: "Flurries",
+    5100: "Light Snow",
+    5101: "Heavy Snow",
+    6000: "Freezing Drizzle",
+    6001: "Freezing Rain",
+    6200: "Light Freezing Rain",
+    6201: "Heavy Freezing Rain",
+    7000: "Ice Pellets",
+    7101: "Heavy Ice Pellets",
+    7102: "Light Ice Pellets",
+    8000: "Thunderstorm"
+}
+
+# Codes whose condition mentions rain, drizzle, thunderstorm or snow.
+_RAIN_CODES = frozenset({4000, 4001, 4200, 4201, 5000, 5100, 5101, 6000, 6001, 6200, 6201, 8000})
 
 def classify_temperature(temp: float) -> str:
-    if temp < 0:
-        return "Freezing"
-    elif 0 <= temp < 10:
-        return "Cold"
-    elif 10 <= temp < 20:
-        return "Cool"
-    elif 20 <= temp < 30:
-        return "Warm"
-    else:
-        return "Hot"
+    return _TEMP_LABELS[bisect_right(_TEMP_EDGES, temp)]
 
 def get_condition(code: int) -> str:
-    conditions = {
-        0: "Unknown",
-        1000: "Clear, Sunny",
-        1100: "Mostly Clear",
-        1101: "Partly Cloudy",
-        1102: "Mostly Cloudy",
-        1001: "Cloudy",
-        2000: "Fog",
-        2100: "Light Fog",
-        4000: "Drizzle",
-        4001: "Rain",
-        4200: "Light Rain",
-        4201: "Heavy Rain",
-        5000: "Snow",
-        5001: "Flurries",
-        5100: "Light Snow",
-        5101: "Heavy Snow",
-        6000: "Freezing Drizzle",
-        6001: "Freezing Rain",
-        6200: "Light Freezing Rain",
-        6201: "Heavy Freezing Rain",
-        7000: "Ice Pellets",
-        7101: "Heavy Ice Pellets",
-        7102: "Light Ice Pellets",
-        8000: "Thunderstorm"
-    }
-    return conditions.get(code, "Unknown")
+    return _CONDITIONS.get(code, "Unknown")
 
 def get_weather(location: str) -> dict:
     api_key = os.getenv("TOMORROW_API_KEY")
@@ -67,81 +132,75 @@ def get_weather(location: str) -> dict:
     if not api_key:
         raise ValueError("TOMORROW_API_KEY environment variable not set")
 
-    response = requests.get(f"https://api.tomorrow.io/v4/weather/realtime?location={location}&apikey={api_key}")
+    cached = _cache_get(_realtime_cache, location)
+    if cached is not None:
+        return cached
+
+    response = _session.get(f"https://api.tomorrow.io/v4/weather/realtime?location={location}&apikey={api_key}", timeout=REQUEST_TIMEOUT)
 
     if response.status_code == 200:
-        data = parse_json(response.text)
+        data = parse_json(response.content)
         temperature = data['data']['values']['temperature']
         
-        return {
+        weather = {
             "location": location,
             "classification": classify_temperature(temperature),
             "temperature": f"{temperature}°C",
             "condition": get_condition(data['data']['values']['weatherCode'])
         }
+        _cache_set(_realtime_cache, location, weather, REALTIME_CACHE_TTL)
+
+        return weather
     else:
         raise Exception("Failed to fetch weather data")
     
-def transform_forecast_data(data: dict) -> ForeCastResponse:
+def extract_forecast_values(data: dict) -> ForecastValues:
     values = data.get('values', {})
-    condition = get_condition(values.get('weatherCode', 0))
-    
+
     return {
         "time": data.get('time', ''),
-        "temperature": f"{values.get('temperature', 0)}°C",
-        "condition": condition,
-        "windSpeed": f"{values.get('windSpeed', 0)} km/h",
-        "precipitationProbability": f"{values.get('precipitationProbability', 0)}",
-        "humidity": f"{values.get('humidity', 0)}%"
+        "temperature": values.get('temperature', 0),
+        "weatherCode": values.get('weatherCode', 0),
+        "windSpeed": values.get('windSpeed', 0),
+        "humidity": values.get('humidity', 0),
+        "precipitationProbability": values.get('precipitationProbability', 0)
     }
 
-def filter_forecast_by_date(forecasts: list[ForeCastResponse], target_date: str) -> list[ForeCastResponse]:
-    return [forecast for forecast in forecasts if forecast['time'].startswith(target_date)]
+def transform_forecast_data(values: ForecastValues) -> ForeCastResponse:
+    return {
+        "time": values['time'],
+        "temperature": f"{values['temperature']}°C",
+        "condition": get_condition(values['weatherCode']),
+        "windSpeed": f"{values['windSpeed']} km/h",
+        "precipitationProbability": f"{values['precipitationProbability']}",
+        "humidity": f"{values['humidity']}%"
+    }
+
+def filter_forecast_by_date(records: list[dict], target_date: str) -> list[ForecastValues]:
+    return [extract_forecast_values(entry) for entry in records if entry.get('time', '').startswith(target_date)]
 
-def summarize_forecast(forecasts: list[ForeCastResponse]) -> str:
+def reduce_series(values: list[float]) -> tuple[float, float, float]:
+    """Returns the (min, mean, max) of a non-empty series."""
+    return min(values), sum(values) / len(values), max(values)
+
+def summarize_forecast(forecasts: list[ForecastValues]) -> str:
     if not forecasts:
         return "No forecast data available for the specified date."
 
-    temperatures = []
-    conditions = []
-    precipitation_probs = []
-    
-    for forecast in forecasts:
-        temp_str = forecast['temperature'].replace('°C', '')
-        try:
-            temp = float(temp_str)
-            temperatures.append(temp)
-        except ValueError:
-            pass
-            
-        conditions.append(forecast['condition'].lower())
-        
-        precip_str = forecast['precipitationProbability']
-        try:
-            precip = float(precip_str)
-            precipitation_probs.append(precip)
-        except ValueError:
-            pass
+    temperatures = [float(forecast['temperature']) for forecast in forecasts if forecast['temperature'] is not None]
+    precipitation_probs = [float(forecast['precipitationProbability']) for forecast in forecasts if forecast['precipitationProbability'] is not None]
+    weather_codes = {forecast['weatherCode'] for forecast in forecasts}
     
     summary = []
     
     if temperatures:
-        avg_temp = sum(temperatures) / len(temperatures)
-        max_temp = max(temperatures)
-        min_temp = min(temperatures)
+        min_temp, avg_temp, max_temp = reduce_series(temperatures)
         
         temp_classification = classify_temperature(avg_temp)
-        
-        if avg_temp < 10:
-            summary.append(f"It will be {temp_classification.lower()} with temperatures ranging from {min_temp}°C to {max_temp}°C (average {avg_temp:.1f}°C).")
-        elif avg_temp > 25:
-            summary.append(f"It will be {temp_classification.lower()} with temperatures ranging from {min_temp}°C to {max_temp}°C (average {avg_temp:.1f}°C).")
-        else:
-            summary.append(f"It will be {temp_classification.lower()} with temperatures ranging from {min_temp}°C to {max_temp}°C (average {avg_temp:.1f}°C).")
+        summary.append(f"It will be {temp_classification.lower()} with temperatures ranging from {min_temp}°C to {max_temp}°C (average {avg_temp:.1f}°C).")
     
     if precipitation_probs:
-        max_precip = max(precipitation_probs)
-        avg_precip = sum(precipitation_probs) / len(precipitation_probs)
+        _, avg_precip, max_precip = reduce_series(precipitation_probs)
         
         if max_precip > 70:
             summary.append("Yes, it will likely rain with high probability of precipitation.")
@@ -152,38 +211,57 @@ def summarize_forecast(forecasts: list[ForeCastResponse]) -> str:
         else:
             summary.append("It's unlikely to rain.")
     
-    rain_conditions = ['rain', 'drizzle', 'thunderstorm', 'snow']
-    will_rain = any(any(rain_word in condition for rain_word in rain_conditions) for condition in conditions)
+    will_rain = not _RAIN_CODES.isdisjoint(weather_codes)
     
     if will_rain:
         summary.append("Expect wet weather conditions.")
     
-    summary.append("\nHourly breakdown:")
-    for forecast in forecasts:
-        summary.append(f"• {forecast['time']}: {forecast['temperature']} with {forecast['condition']}, {forecast['precipitationProbability']}% chance of rain")
+    hourly_lines = [
+        f"• {forecast['time']}: {forecast['temperature']} with {forecast['condition']}, {forecast['precipitationProbability']}% chance of rain"
+        for forecast in map(transform_forecast_data, forecasts)
+    ]
+    summary.append("\nHourly breakdown:\n" + "\n".join(hourly_lines))
 
     return "\n".join(summary)
 
-def get_forecast(location: str) -> list[ForeCastResponse]:
+def get_forecast(location: str) -> list[dict]:
     api_key = os.getenv("TOMORROW_API_KEY")
     
     if not api_key:
         raise ValueError("TOMORROW_API_KEY environment variable not set")
 
-    response = requests.get(f"https://api.tomorrow.io/v4/weather/forecast", params={
-        "apikey": api_key,
-        "location": location,
-        "timesteps": ["1h"],
-        "units": "metric"
-    })
+    cached = _cache_get(_forecast_cache, location)
+    if cached is not None:
+        return cached
 
-    if response.status_code == 200:
-        records = parse_json(response.text)
-        
-        return list(map(transform_forecast_data, records['timelines']['hourly']))
-    else:
-        print("Error fetching forecast:", response.text)
-        raise Exception("Failed to fetch weather forecast")
+    hour = datetime.now(timezone.utc).strftime("%Y%m%d%H")
+    payload = disk_cache.load_forecast(location, hour)
+    fetched = payload is None
+
+    if fetched:
+        response = _session.get(f"https://api.tomorrow.io/v4/weather/forecast", params={
+            "apikey": api_key,
+            "location": location,
+            "timesteps": ["1h"],
+            "units": "metric"
+        }, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code != 200:
+            print("Error fetching forecast:", response.text)
+            raise Exception("Failed to fetch weather forecast")
+
+        payload = response.content
+
+    records = parse_json(payload)
+    hourly = records['timelines']['hourly']
+
+    # Only persist payloads that parsed into the expected shape.
+    if fetched:
+        disk_cache.store_forecast(location, hour, payload)
+
+    _cache_set(_forecast_cache, location, hourly, FORECAST_CACHE_TTL)
+
+    return hourly
 
 def forecast_weather(location: str, period: str) -> str:
     """
@@ -212,7 +290,7 @@ def forecast_weather(location: str, period: str) -> str:
                     
     """
     date = date_utils.normalize_date(period)
-    print("Fetching forecast for:", location, "on:", date_utils.normalize_date(period))
+    print("Fetching forecast for:", location, "on:", date)
     weathers = get_forecast(location)
     filtered = filter_forecast_by_date(weathers, date)
     summary = summarize_forecast(filtered)
@@ -227,9 +305,14 @@ def compare_weather(requests: list[WeatherRequest]) -> str:
             location: This is the longitude and latitude of the location. For example: "48.8566,2.3522" for Paris or "34.0522,-118.2437" for Los Angeles
             city: This is the name of the city. For example: "Paris" or "Los Angeles"
     """
+    if not requests:
+        return ""
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CONNECTIONS, len(requests))) as executor:
+        weathers = list(executor.map(get_weather, [req.get('location') for req in requests]))
+
     results = []
-    for req in requests:
-        weather = get_weather(req.get('location'))
+    for req, weather in zip(requests, weathers):
         results.append(f"The current weather in {req.get('city')} is {weather['classification']} with a temperature of {weather['temperature']} and conditions are {weather['condition']}.")
     
     return "\n".join(results)
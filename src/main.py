@@ -8,4 +8,5 @@ def run():
     response = agent.execute(prompt)
     print(response)
 
-run()
\ No newline at end of file
+if __name__ == "__main__":
+    run()